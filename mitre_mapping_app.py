@@ -1,85 +1,334 @@
 import pandas as pd
 import streamlit as st
 import requests
-from sentence_transformers import SentenceTransformer, util
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from sentence_transformers import SentenceTransformer
 import torch
-import json
+import numpy as np
+import io
+import orjson
+import os
+import platform
 import datetime
+import hashlib
 import base64
-import uuid
+from collections import Counter
 import plotly.graph_objects as go
 
 st.set_page_config(layout="wide")
 
+# Tokenizer worker threads would only contend with torch's own thread pool
+os.environ.setdefault('TOKENIZERS_PARALLELISM', 'false')
+torch.set_num_threads(max(1, (os.cpu_count() or 2) // 2))
+
+# Smaller batches keep GPUs with 8 GB or less out of OOM; MITRE_ENCODE_BS overrides
+def default_encode_batch_size():
+    if torch.cuda.is_available() and torch.cuda.get_device_properties(0).total_memory <= 8 * 1024 ** 3:
+        return 32
+    return 64
+
+def encode_batch_size():
+    value = os.environ.get("MITRE_ENCODE_BS")
+    if value is None:
+        return default_encode_batch_size()
+    try:
+        batch_size = int(value)
+    except ValueError:
+        batch_size = 0
+    if batch_size < 1:
+        st.warning(f"Ignoring invalid MITRE_ENCODE_BS={value!r}; it must be a positive integer")
+        return default_encode_batch_size()
+    return batch_size
+
+ENCODE_BATCH_SIZE = encode_batch_size()
+# Queries scored per similarity matmul, so peak memory stays flat for any CSV size
+SCORE_CHUNK_SIZE = 4096
+
+MITRE_ATTACK_URL = "https://raw.githubusercontent.com/mitre-attack/attack-stix-data/master/enterprise-attack/enterprise-attack.json"
+MITRE_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "mitre")
+
+MODEL_NAME = 'all-MiniLM-L6-v2'
+# Dynamically quantized INT8 exports published alongside the model on the Hub
+ONNX_QUANTIZED_FILE = "onnx/model_qint8_arm64.onnx" if platform.machine().lower() in ("arm64", "aarch64") else "onnx/model_quint8_avx2.onnx"
+
+NAVIGATOR_PLATFORMS = ["Linux", "macOS", "Windows", "Network", "PRE", "Containers", "Office 365", "SaaS", "IaaS", "Google Workspace", "Azure AD"]
+
+NAVIGATOR_LAYOUT = {
+    "layout": "side",
+    "aggregateFunction": "max",
+    "showID": True,
+    "showName": True,
+    "showAggregateScores": True,
+    "countUnscored": False
+}
+
+NAVIGATOR_INSTRUCTIONS = """
+**Steps: Upload the downloaded file**
+1. Download the Navigator Layer JSON using the button above
+2. Visit the [MITRE ATT&CK Navigator](https://mitre-attack.github.io/attack-navigator/)
+3. Click "Open Existing Layer" and then "Upload from Local"
+4. Select the downloaded `navigator_layer.json` file
+"""
+
+# One session per process (Streamlit re-executes module code on every rerun),
+# so later bundle refreshes reuse the pooled TLS connection; transient failures
+# are retried and a hung server times out instead of blocking the app
+@st.cache_resource
+def get_http_session():
+    session = requests.Session()
+    session.mount("https://", HTTPAdapter(
+        pool_connections=1,
+        max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=(429, 500, 502, 503, 504))
+    ))
+    return session
+
 # Load embedding model with error handling
 @st.cache_resource
 def load_model():
     try:
         device = torch.device('cuda' if torch.cuda.is_available() else 'cpu')
-        model = SentenceTransformer('all-MiniLM-L6-v2')
+        if device.type == 'cpu':
+            # INT8 ONNX Runtime is considerably faster on CPU; fall back to the
+            # FP32 torch model if the backend or the quantized file is missing
+            try:
+                return SentenceTransformer(MODEL_NAME, backend="onnx", model_kwargs={"file_name": ONNX_QUANTIZED_FILE})
+            except Exception:
+                pass
+        model = SentenceTransformer(MODEL_NAME)
         model = model.to(device)
+        if device.type == 'cuda':
+            # FP16 runs the encoder on tensor cores; ranking by cosine
+            # similarity is unaffected
+            model = model.half()
+            # Compile only the underlying HF encoder, not the SentenceTransformer
+            # wrapper. Batch size and padded length change on every encode, so
+            # compile with dynamic shapes and no CUDA graphs; the warm-up makes
+            # the first compile happen here and a failure reverts to eager
+            encoder = model[0].auto_model
+            try:
+                model[0].auto_model = torch.compile(encoder, dynamic=True, fullgraph=False)
+                with torch.inference_mode():
+                    model.encode(["warm-up"], show_progress_bar=False)
+            except Exception:
+                model[0].auto_model = encoder
         return model
     except Exception as e:
         st.error(f"Error loading model: {e}")
         return None
 
-@st.cache_data
-def load_mitre_data():
+# Download the STIX bundle, revalidating a copy kept on disk with its ETag /
+# Last-Modified validators so an unchanged bundle costs a 304 instead of the
+# full transfer
+def fetch_attack_bundle():
+    bundle_path = os.path.join(MITRE_CACHE_DIR, "enterprise-attack.json")
+    validators_path = bundle_path + ".validators.json"
+    headers = {}
+    if os.path.exists(bundle_path) and os.path.exists(validators_path):
+        try:
+            with open(validators_path, 'rb') as f:
+                validators = orjson.loads(f.read())
+            if validators.get('etag'):
+                headers['If-None-Match'] = validators['etag']
+            if validators.get('last_modified'):
+                headers['If-Modified-Since'] = validators['last_modified']
+        except (OSError, orjson.JSONDecodeError):
+            headers = {}
+
     try:
-        response = requests.get("https://raw.githubusercontent.com/mitre-attack/attack-stix-data/master/enterprise-attack/enterprise-attack.json")
-        attack_data = response.json()
-        techniques = []
-        tactic_mapping = {}
-
-        for obj in attack_data['objects']:
-            if obj.get('type') == 'x-mitre-tactic':
-                tactic_id = obj.get('external_references', [{}])[0].get('external_id', 'N/A')
-                tactic_name = obj.get('name', 'N/A')
-                tactic_mapping[tactic_name] = tactic_id
-
-        for obj in attack_data['objects']:
-            if obj.get('type') == 'attack-pattern':
-                tech_id = obj.get('external_references', [{}])[0].get('external_id', 'N/A')
-                if '.' in tech_id:
-                    continue
-                techniques.append({
-                    'id': tech_id,
-                    'name': obj.get('name', 'N/A'),
-                    'description': obj.get('description', ''),
-                    'tactic': ', '.join([phase['phase_name'] for phase in obj.get('kill_chain_phases', [])]),
-                    'tactics_list': [phase['phase_name'] for phase in obj.get('kill_chain_phases', [])],
-                    'url': obj.get('external_references', [{}])[0].get('url', '')
-                })
-        return techniques, tactic_mapping
-    except Exception as e:
-        st.error(f"Error loading MITRE data: {e}")
-        return [], {}
+        response = get_http_session().get(MITRE_ATTACK_URL, headers=headers, timeout=10)
+        if response.status_code != 304:
+            response.raise_for_status()
+    except requests.RequestException:
+        # Offline, GitHub unreachable or an HTTP error status: serve the last
+        # good copy if there is one
+        if os.path.exists(bundle_path):
+            with open(bundle_path, 'rb') as f:
+                return f.read()
+        raise
+    if response.status_code == 304:
+        with open(bundle_path, 'rb') as f:
+            return f.read()
 
-@st.cache_resource
-def get_mitre_embeddings(_model, techniques):
-    if _model is None or not techniques:
-        return None
+    content = response.content
+    validators = {
+        'etag': response.headers.get('ETag'),
+        'last_modified': response.headers.get('Last-Modified')
+    }
     try:
-        descriptions = [tech['description'] for tech in techniques]
-        return _model.encode(descriptions, convert_to_tensor=True)
-    except Exception as e:
-        st.error(f"Error computing embeddings: {e}")
-        return None
+        os.makedirs(MITRE_CACHE_DIR, exist_ok=True)
+        tmp_path = bundle_path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(content)
+        os.replace(tmp_path, bundle_path)
+        with open(validators_path, 'wb') as f:
+            f.write(orjson.dumps(validators))
+    except OSError:
+        # The disk cache is best effort; a read-only home just means no 304s
+        pass
+    return content
+
+# Errors propagate so a failed download or parse isn't cached for the ttl
+@st.cache_data(ttl=86400, show_spinner=False)
+def load_mitre_data():
+    attack_data = orjson.loads(fetch_attack_bundle())
+    techniques = []
+    tactic_mapping = {}
+
+    # Single pass over the bundle; anything that isn't a tactic or a
+    # technique is skipped before any other field is read, then revoked or
+    # deprecated entries are dropped so they are never mapping candidates
+    for obj in attack_data['objects']:
+        obj_type = obj.get('type')
+        if obj_type not in ('x-mitre-tactic', 'attack-pattern'):
+            continue
+        if obj.get('revoked') or obj.get('x_mitre_deprecated'):
+            continue
+        if obj_type == 'x-mitre-tactic':
+            refs = obj.get('external_references')
+            tactic_id = refs[0].get('external_id', 'N/A') if refs else 'N/A'
+            tactic_name = obj.get('name', 'N/A')
+            tactic_mapping[tactic_name] = tactic_id
+        elif obj_type == 'attack-pattern':
+            refs = obj.get('external_references')
+            tech_id = refs[0].get('external_id', 'N/A') if refs else 'N/A'
+            if '.' in tech_id:
+                continue
+            tactics_list = [phase['phase_name'] for phase in obj.get('kill_chain_phases', [])]
+            techniques.append({
+                'id': tech_id,
+                'name': obj.get('name', 'N/A'),
+                'description': obj.get('description', ''),
+                'tactic': ', '.join(tactics_list),
+                'tactics_list': tactics_list,
+                'url': refs[0].get('url', '') if refs else ''
+            })
+
+    # Parallel (structure-of-arrays) columns so mapping results are
+    # gathered with one fancy index per column instead of per-row dict reads
+    technique_columns = {
+        'id': np.array([tech['id'] for tech in techniques], dtype=object),
+        'label': np.array([f"{tech['id']} - {tech['name']}" for tech in techniques], dtype=object),
+        'tactic': np.array([tech['tactic'] for tech in techniques], dtype=object),
+        'url': np.array([tech['url'] for tech in techniques], dtype=object)
+    }
+    # Content hash of the technique text, computed once per bundle load and
+    # used to key the cached embeddings
+    digest = hashlib.sha1()
+    for tech in techniques:
+        digest.update(f"|{tech['id']}|{tech['description']}".encode())
+    return techniques, tactic_mapping, technique_columns, digest.hexdigest()
+
+# Embeddings depend on the model, its backend/device and the exact technique
+# text, so all of them go into the on-disk cache key (vectors are stored
+# L2-normalized)
+def embeddings_cache_path(model, techniques_digest):
+    backend = getattr(model, 'backend', 'torch')
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    digest = hashlib.sha1(f"{MODEL_NAME}|{backend}|{device}|l2|{techniques_digest}".encode())
+    return os.path.join(MITRE_CACHE_DIR, f"embeddings-{digest.hexdigest()}.pt")
 
-def map_to_mitre(description, model, mitre_techniques, mitre_embeddings):
+# Keyed only on the technique digest from load_mitre_data (the model is a
+# process-wide resource), so reruns hash nothing. cache_resource hands back the
+# same tensor, already on the model's device, without pickling it, which keeps
+# a disk-loaded matrix memory-mapped on CPU. Errors propagate to the caller
+@st.cache_resource(max_entries=2, show_spinner=False)
+def get_mitre_embeddings(_model, _techniques, techniques_digest):
+    device = 'cuda' if torch.cuda.is_available() else 'cpu'
+    cache_path = embeddings_cache_path(_model, techniques_digest)
+    if os.path.exists(cache_path):
+        try:
+            return torch.load(cache_path, map_location='cpu', mmap=True).to(device)
+        except Exception:
+            pass
+
+    # Encode repeated (or empty) descriptions once and expand back to one
+    # row per technique, so argmax indices still map onto _techniques
+    descriptions = [tech['description'] for tech in _techniques]
+    unique_index = {description: i for i, description in enumerate(dict.fromkeys(descriptions))}
+    with torch.inference_mode():
+        unique_embeddings = _model.encode(list(unique_index), batch_size=ENCODE_BATCH_SIZE, convert_to_tensor=True, normalize_embeddings=True, show_progress_bar=False).cpu()
+        embeddings = unique_embeddings[[unique_index[description] for description in descriptions]]
+    try:
+        os.makedirs(MITRE_CACHE_DIR, exist_ok=True)
+        tmp_path = cache_path + ".tmp"
+        torch.save(embeddings, tmp_path)
+        os.replace(tmp_path, cache_path)
+    except OSError:
+        pass
+    return embeddings.to(device)
+
+# Encode every description in one batched call and score them all against
+# the technique corpus with a single similarity matrix. Both sides are unit
+# vectors, so cosine similarity is a plain matmul. Errors are left to
+# propagate so map_csv never caches a failed mapping (e.g. a transient CUDA OOM)
+def map_to_mitre_batch(descriptions, model, technique_columns, mitre_embeddings):
+    n = len(descriptions)
+    no_match = np.empty(0, dtype=np.int64)
     if model is None or mitre_embeddings is None:
-        return "N/A", "N/A", "N/A", []
+        return ["N/A"] * n, ["N/A"] * n, ["N/A"] * n, no_match
+    if n == 0:
+        return [], [], [], no_match
+    # Use-case CSVs often repeat descriptions; encode each distinct one once
+    unique_descriptions = list(dict.fromkeys(descriptions))
+    # encode() already length-sorts its inputs before batching, so padding
+    # is minimal without pre-sorting here
+    with torch.inference_mode():
+        query_embeddings = model.encode(unique_descriptions, batch_size=ENCODE_BATCH_SIZE, convert_to_tensor=True, normalize_embeddings=True, show_progress_bar=False)
+        best = torch.cat([(chunk @ mitre_embeddings.T).argmax(dim=1) for chunk in torch.split(query_embeddings, SCORE_CHUNK_SIZE)])
+        best_by_description = dict(zip(unique_descriptions, best.cpu().tolist()))
+    best_match_idx = np.fromiter((best_by_description[description] for description in descriptions), dtype=np.int64, count=n)
+    return (
+        technique_columns['tactic'][best_match_idx],
+        technique_columns['label'][best_match_idx],
+        technique_columns['url'][best_match_idx],
+        best_match_idx
+    )
+
+# Keyed on the uploaded bytes plus the technique digest, so Streamlit reruns
+# triggered by unrelated widgets reuse the mapping instead of re-encoding, and
+# a refreshed ATT&CK release remaps the same upload
+@st.cache_data(ttl=86400, max_entries=8, show_spinner=False)
+def map_csv(csv_bytes, techniques_digest, _model, _technique_columns, _mitre_embeddings):
+    # The multithreaded Arrow reader is much faster on large free-text CSVs;
+    # older pandas/pyarrow combinations fall back to the default engine
     try:
-        query_embedding = model.encode(description, convert_to_tensor=True)
-        scores = util.cos_sim(query_embedding, mitre_embeddings)[0]
-        best_match_idx = scores.argmax().item()
-        best_tech = mitre_techniques[best_match_idx]
-        return best_tech['tactic'], f"{best_tech['id']} - {best_tech['name']}", best_tech['url'], best_tech['tactics_list']
-    except Exception as e:
-        st.error(f"Error mapping to MITRE: {e}")
-        return "Error", "Error", "Error", []
+        df = pd.read_csv(io.BytesIO(csv_bytes), engine="pyarrow", dtype_backend="pyarrow")
+    except (ImportError, TypeError, ValueError):
+        df = pd.read_csv(io.BytesIO(csv_bytes))
+    required_col = 'Description' if 'Description' in df.columns else 'description' if 'description' in df.columns else None
+    if not required_col:
+        return df, None, Counter()
+
+    # Cast before filling: an Arrow-typed column (null, numeric, bool) rejects
+    # a string fill value
+    descriptions = df[required_col].astype("string").fillna("").tolist()
+    tactics, techniques, references, best_match_idx = map_to_mitre_batch(descriptions, _model, _technique_columns, _mitre_embeddings)
+    mapped_columns = {
+        'Mapped MITRE Tactic(s)': tactics,
+        'Mapped MITRE Technique(s)/Sub-techniques': techniques,
+        'Reference Resource(s)': references
+    }
+    return df, mapped_columns, Counter(_technique_columns['id'][best_match_idx].tolist())
 
-def create_navigator_layer(techniques_count):
+@st.cache_data(max_entries=32, show_spinner=False)
+def create_coverage_chart(covered, total_techniques):
+    uncovered = max(total_techniques - covered, 0)
+    coverage_percent = round((covered / total_techniques) * 100, 2) if total_techniques else 0
+    fig = go.Figure(data=[go.Pie(
+        labels=['Covered Techniques', 'Remaining'],
+        values=[covered, uncovered],
+        hole=.6,
+        marker=dict(colors=['green', 'lightgrey'])
+    )])
+    fig.update_layout(title_text=f'MITRE Coverage: {coverage_percent}%', showlegend=True)
+    return fig
+
+# Keyed on the sorted (technique, count) pairs and the date, so reruns with an
+# unchanged mapping reuse the serialized layer but a new day gets a new name
+@st.cache_data(max_entries=32, show_spinner=False)
+def create_navigator_layer(technique_counts, current_date):
+    techniques_count = dict(technique_counts)
     try:
         techniques_data = []
         for tech_id, count in techniques_count.items():
@@ -93,8 +342,6 @@ def create_navigator_layer(techniques_count):
                 "links": [],
                 "showSubtechniques": False
             })
-        current_date = datetime.datetime.now().strftime("%Y-%m-%d")
-        layer_id = str(uuid.uuid4())
         layer = {
             "name": f"Security Use Cases Mapping - {current_date}",
             "versions": {
@@ -105,17 +352,10 @@ def create_navigator_layer(techniques_count):
             "domain": "enterprise-attack",
             "description": f"Mapping of security use cases to MITRE ATT&CK techniques, generated on {current_date}",
             "filters": {
-                "platforms": ["Linux", "macOS", "Windows", "Network", "PRE", "Containers", "Office 365", "SaaS", "IaaS", "Google Workspace", "Azure AD"]
+                "platforms": NAVIGATOR_PLATFORMS
             },
             "sorting": 0,
-            "layout": {
-                "layout": "side",
-                "aggregateFunction": "max",
-                "showID": True,
-                "showName": True,
-                "showAggregateScores": True,
-                "countUnscored": False
-            },
+            "layout": NAVIGATOR_LAYOUT,
             "hideDisabled": False,
             "techniques": techniques_data,
             "gradient": {
@@ -131,100 +371,90 @@ def create_navigator_layer(techniques_count):
             "selectTechniquesAcrossTactics": True,
             "selectSubtechniquesWithParent": False
         }
-        return json.dumps(layer, indent=2), layer_id
+        # Compact bytes for the download, indented text only for the on-page preview
+        return orjson.dumps(layer), orjson.dumps(layer, option=orjson.OPT_INDENT_2).decode()
     except Exception as e:
         st.error(f"Error creating Navigator layer: {e}")
-        return "{}", ""
+        return b"{}", "{}"
+
+# Runs as a fragment so the layer download button (and any future widget in
+# this section) reruns only the visualizations, not the whole mapping pass
+@st.fragment
+def render_visualizations(techniques_count, total_techniques):
+    st.markdown("---")
+    st.subheader("MITRE ATT&CK Coverage Overview")
+
+    fig = create_coverage_chart(len(techniques_count), total_techniques)
+    st.plotly_chart(fig, use_container_width=True)
+
+    st.markdown("---")
+    st.subheader("MITRE ATT&CK Navigator Layer")
+
+    navigator_layer, navigator_layer_preview = create_navigator_layer(
+        tuple(sorted(techniques_count.items())),
+        datetime.datetime.now().strftime("%Y-%m-%d")
+    )
+
+    # Provide direct download for navigator layer JSON
+    st.download_button(
+        label="Download Navigator Layer JSON",
+        data=navigator_layer,
+        file_name="navigator_layer.json",
+        mime="application/json"
+    )
+
+    st.markdown("### How to View in MITRE ATT&CK Navigator")
+    st.markdown(NAVIGATOR_INSTRUCTIONS)
+
+    with st.expander("View Layer JSON"):
+        st.code(navigator_layer_preview, language="json")
 
 def main():
     st.title("MITRE ATT&CK Mapping Tool for Security Use Cases")
     model = load_model()
     if model is None:
         return
-    mitre_techniques, tactic_mapping = load_mitre_data()
+    try:
+        mitre_techniques, tactic_mapping, technique_columns, techniques_digest = load_mitre_data()
+    except Exception as e:
+        st.error(f"Error loading MITRE data: {e}")
+        return
     if not mitre_techniques:
         return
-    mitre_embeddings = get_mitre_embeddings(model, mitre_techniques)
-    if mitre_embeddings is None:
+    try:
+        mitre_embeddings = get_mitre_embeddings(model, mitre_techniques, techniques_digest)
+    except Exception as e:
+        st.error(f"Error computing embeddings: {e}")
         return
 
     uploaded_file = st.file_uploader("Upload a CSV with security use cases", type="csv")
 
     if uploaded_file is not None:
         try:
-            df = pd.read_csv(uploaded_file)
+            # Raised errors aren't cached by st.cache_data, so the next rerun retries
+            try:
+                with st.spinner("Mapping use cases to MITRE ATT&CK..."):
+                    df, mapped_columns, techniques_count = map_csv(uploaded_file.getvalue(), techniques_digest, model, technique_columns, mitre_embeddings)
+            except Exception as e:
+                st.error(f"Error mapping to MITRE: {e}")
+                return
             st.subheader("CSV Structure")
             st.dataframe(df.head())
-            required_col = 'Description' if 'Description' in df.columns else 'description' if 'description' in df.columns else None
-            if not required_col:
+            if mapped_columns is None:
                 st.error("Your CSV must contain a 'Description' column.")
                 return
 
-            tactics, techniques, references, all_tactics_lists = [], [], [], []
-            techniques_count = {}
-
-            with st.spinner("Mapping use cases to MITRE ATT&CK..."):
-                for _, row in df.iterrows():
-                    tactic, technique, reference, tactics_list = map_to_mitre(row[required_col], model, mitre_techniques, mitre_embeddings)
-                    tactics.append(tactic)
-                    techniques.append(technique)
-                    references.append(reference)
-                    all_tactics_lists.append(tactics_list)
-                    if '-' in technique:
-                        tech_id = technique.split('-')[0].strip()
-                        techniques_count[tech_id] = techniques_count.get(tech_id, 0) + 1
-
-            df['Mapped MITRE Tactic(s)'] = tactics
-            df['Mapped MITRE Technique(s)/Sub-techniques'] = techniques
-            df['Reference Resource(s)'] = references
+            df = df.assign(**mapped_columns)
 
             st.success("Mapping complete!")
             st.dataframe(df)
 
-            csv = df.to_csv(index=False).encode('utf-8')
-            st.download_button("Download Results as CSV", csv, "mitre_mapped_output.csv", "text/csv")
-
-            st.markdown("---")
-            st.subheader("MITRE ATT&CK Coverage Overview")
-
-            total_techniques = 203
-            covered = len(techniques_count.keys())
-            uncovered = total_techniques - covered
-            coverage_percent = round((covered / total_techniques) * 100, 2)
-
-            fig = go.Figure(data=[go.Pie(
-                labels=['Covered Techniques', 'Remaining'],
-                values=[covered, uncovered],
-                hole=.6,
-                marker=dict(colors=['green', 'lightgrey'])
-            )])
-            fig.update_layout(title_text=f'MITRE Coverage: {coverage_percent}%', showlegend=True)
-            st.plotly_chart(fig, use_container_width=True)
-
-            st.markdown("---")
-            st.subheader("MITRE ATT&CK Navigator Layer")
-
-            navigator_layer, layer_id = create_navigator_layer(techniques_count)
-            
-            # Provide direct download for navigator layer JSON
-            st.download_button(
-                label="Download Navigator Layer JSON",
-                data=navigator_layer,
-                file_name="navigator_layer.json",
-                mime="application/json"
-            )
-
-            st.markdown("### How to View in MITRE ATT&CK Navigator")
-            st.markdown("""
-            **Steps: Upload the downloaded file**
-            1. Download the Navigator Layer JSON using the button above
-            2. Visit the [MITRE ATT&CK Navigator](https://mitre-attack.github.io/attack-navigator/)
-            3. Click "Open Existing Layer" and then "Upload from Local"
-            4. Select the downloaded `navigator_layer.json` file
-            """)
-            
-            with st.expander("View Layer JSON"):
-                st.code(navigator_layer, language="json")
+            # Write straight to bytes rather than building a str and encoding it
+            csv_buffer = io.BytesIO()
+            df.to_csv(csv_buffer, index=False, encoding='utf-8')
+            st.download_button("Download Results as CSV", csv_buffer.getvalue(), "mitre_mapped_output.csv", "text/csv")
+
+            render_visualizations(techniques_count, len(mitre_techniques))
 
         except Exception as e:
             st.exception(e)